@@ -3,15 +3,18 @@
 Generate a wallpaper with a Chinese character, Korean equivalent, pinyin, and English definition.
 """
 
-import json
+import functools
+import mmap
 import os
 import random
-import xml.etree.ElementTree as ET
+from base64 import b64encode
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Optional
+from xml.sax.saxutils import escape
 
-import svgwrite
+import orjson
 from PIL import Image, ImageDraw, ImageFont
 
 # --- Configuration ---
@@ -44,20 +47,89 @@ BASE_FONT_SIZES = {
     "definition": 60,
 }
 
+# Spacing (in pixels at the base resolution) between the text blocks
+BASE_SPACING = {
+    "center_offset": 100,
+    "character_gap": 140,
+    "svg_character_gap": 72,
+    "pinyin_gap": 90,
+    "korean_gap": 70,
+}
+
 # Colors
 BACKGROUND_COLOR = "#000000"
 TEXT_COLOR = "#F0F0F0"
 SECONDARY_COLOR = "#B4B4BE"
 
-# Font paths
+# zlib level for PNG output; the wallpaper is mostly flat black, so higher
+# levels cost far more encode time than they save in bytes
+PNG_COMPRESS_LEVEL = 1
+
+# Font paths; prefer the dataset subsets written by subset_fonts.py when present
 SCRIPT_DIR = Path(__file__).parent
-CHINESE_FONT = str(SCRIPT_DIR / "fonts" / "YRDZST-Medium.ttf")
-JAPANESE_FONT = str(SCRIPT_DIR / "fonts" / "HinaMincho-Regular.ttf")
-KOREAN_FONT = str(SCRIPT_DIR / "fonts" / "Dongle-Regular.ttf")
-LATIN_FONT = str(SCRIPT_DIR / "fonts" / "WDXLLubrifontSC-Regular.ttf")
+FONT_DIR = SCRIPT_DIR / "fonts"
+SUBSET_FONT_DIR = FONT_DIR / "subset"
+
+def _font_path(filename: str) -> str:
+    subset_path = SUBSET_FONT_DIR / filename
+    return str(subset_path if subset_path.exists() else FONT_DIR / filename)
+
+CHINESE_FONT = _font_path("YRDZST-Medium.ttf")
+JAPANESE_FONT = _font_path("HinaMincho-Regular.ttf")
+KOREAN_FONT = _font_path("Dongle-Regular.ttf")
+LATIN_FONT = _font_path("WDXLLubrifontSC-Regular.ttf")
+
+# Character datasets shipped in data/
+DATA_DIR = SCRIPT_DIR / "data"
+CHARACTER_LISTS = ("hsk", "hanja")
+
+# A single entry from data/*_characters.json
+CharacterData = dict[str, Any]
+
+# Extra entities for double-quoted XML attribute values
+_XML_ATTR_ENTITIES = {'"': "&quot;"}
+
+# SVG output templates. Output is minified: the text elements share anchor,
+# baseline, fill and the Latin font through the enclosing <g>.
+_SVG_HEADER_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+    "<defs><style>{font_faces}</style></defs>"
+    '<rect width="{width}" height="{height}" fill="{background}"/>'
+    '<g text-anchor="middle" dominant-baseline="hanging" fill="{fill}" font-family="WDXLLubrifontSC-Regular">'
+)
+_SVG_TEXT_TEMPLATE = '<text x="{x:g}" y="{y}" font-size="{font_size}"{attrs}>{text}</text>'
+_SVG_FOOTER = "</g></svg>"
+_SVG_FONT_FACE_TEMPLATE = "@font-face{{font-family:'{family}';src:url('{src}') format('{format}')}}"
+
+# Font file behind each font-family used in the SVG output
+SVG_FONTS = {
+    "HinaMincho-Regular": JAPANESE_FONT,
+    "YRDZST-Medium": CHINESE_FONT,
+    "Dongle-Regular": KOREAN_FONT,
+    "WDXLLubrifontSC-Regular": LATIN_FONT,
+}
 
 # --- Helper Functions ---
 
+def _scale_layout(width: int) -> dict[str, int]:
+    """Integer font sizes and spacing for a canvas width."""
+    scale_factor = width / BASE_RESOLUTION[0]
+    layout = {key: int(size * scale_factor) for key, size in BASE_FONT_SIZES.items()}
+    layout.update({key: int(size * scale_factor) for key, size in BASE_SPACING.items()})
+    layout["line_height"] = int(BASE_FONT_SIZES["definition"] * scale_factor * 1.3)
+    return layout
+
+
+# Layouts for every supported device width, keyed by width
+SCALED_LAYOUTS = {width: _scale_layout(width) for width, _ in IPHONE_RESOLUTIONS.values()}
+
+
+def get_scaled_layout(width: int) -> dict[str, int]:
+    """Get the precomputed layout for a canvas width."""
+    layout = SCALED_LAYOUTS.get(width)
+    return layout if layout is not None else _scale_layout(width)
+
+
 def wrap_text_svg(text: str, font_size: int, max_width: int, char_width_ratio: float = 0.5) -> list[str]:
     """Wrap text for SVG based on estimated character width."""
     avg_char_width = font_size * char_width_ratio
@@ -82,21 +154,27 @@ def wrap_text_svg(text: str, font_size: int, max_width: int, char_width_ratio: f
     return lines if lines else [text]
 
 
-def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: ImageDraw.ImageDraw) -> list[str]:
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int) -> list[str]:
     """Wrap text to fit within a maximum width."""
     words = text.split()
+    # Measure each distinct word once and fit lines by summing advances
+    word_widths = {word: font.getlength(word) for word in set(words)}
+    space_width = font.getlength(" ")
     lines = []
     current_line = ""
+    current_width = 0.0
 
     for word in words:
-        test_line = f"{current_line} {word}".strip()
-        bbox = draw.textbbox((0, 0), test_line, font=font)
-        if bbox[2] - bbox[0] <= max_width:
-            current_line = test_line
+        word_width = word_widths[word]
+        test_width = current_width + space_width + word_width if current_line else word_width
+        if test_width <= max_width:
+            current_line = f"{current_line} {word}" if current_line else word
+            current_width = test_width
         else:
             if current_line:
                 lines.append(current_line)
             current_line = word
+            current_width = word_width
 
     if current_line:
         lines.append(current_line)
@@ -104,117 +182,187 @@ def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: Ima
     return lines if lines else [text]
 
 
-def get_character_data(character_list: str, character_id: Optional[int] = None) -> dict:
-    """Load character data from the specified JSON file."""
-    filename = f"data/{character_list}_characters.json"
-    with open(filename, "r", encoding="utf-8") as f:
-        data = json.load(f)["characters"]
+@functools.lru_cache(maxsize=4096)
+def _text_bbox(text: str, font: ImageFont.FreeTypeFont) -> tuple[float, float, float, float]:
+    """Measure text once per (text, font); the strings and cached fonts are fixed."""
+    return font.getbbox(text)
+
+
+def _load_character_list(character_list: str) -> list[CharacterData]:
+    """Parse a character list from its JSON file."""
+    filename = DATA_DIR / f"{character_list}_characters.json"
+    # Parse straight from the page cache instead of copying the file into a bytes object
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        characters: list[CharacterData] = orjson.loads(view)["characters"]
+    return characters
+
+
+# Parsed character datasets, loaded once at import: list name -> characters, and id -> character
+_CHAR_LIST = {name: _load_character_list(name) for name in CHARACTER_LISTS}
+_CHAR_DATA = {name: {c["id"]: c for c in characters} for name, characters in _CHAR_LIST.items()}
+
+
+def get_character_data(character_list: str, character_id: Optional[int] = None) -> CharacterData:
+    """Look up character data from the preloaded character lists."""
+    if character_list not in _CHAR_LIST:
+        raise ValueError(f"Unknown character list: {character_list}")
 
     if character_id is None:
-        return random.choice(data)
-    else:
-        for char_data in data:
-            if char_data["id"] == character_id:
-                return char_data
-        raise ValueError(f"Character ID {character_id} not found in {character_list}")
-
-def get_scaled_fonts(scale_factor: float, character_list: str = "hanja") -> dict:
-    """Get fonts with sizes scaled proportionally."""
+        return random.choice(_CHAR_LIST[character_list])
+    try:
+        return _CHAR_DATA[character_list][character_id]
+    except KeyError:
+        raise ValueError(f"Character ID {character_id} not found in {character_list}") from None
+
+@functools.lru_cache(maxsize=None)
+def _font_bytes(font_path: str) -> bytes:
+    """Read a font file into memory once; every face built from it shares the buffer."""
+    return Path(font_path).read_bytes()
+
+@functools.lru_cache(maxsize=128)
+def _load_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    """Load a font face once per (path, pixel size), shared across character lists."""
+    return ImageFont.truetype(BytesIO(_font_bytes(font_path)), size)
+
+@functools.lru_cache(maxsize=64)
+def get_scaled_fonts(width: int, character_list: str = "hanja") -> dict[str, ImageFont.FreeTypeFont]:
+    """Get fonts with sizes scaled proportionally (cached per canvas width and list)."""
     # Use Japanese font for hanja characters, Chinese font for HSK
     char_font = JAPANESE_FONT if character_list == "hanja" else CHINESE_FONT
     
+    layout = get_scaled_layout(width)
     return {
-        "character": ImageFont.truetype(char_font, int(BASE_FONT_SIZES["character"] * scale_factor)),
-        "korean": ImageFont.truetype(KOREAN_FONT, int(BASE_FONT_SIZES["korean"] * scale_factor)),
-        "pinyin": ImageFont.truetype(LATIN_FONT, int(BASE_FONT_SIZES["pinyin"] * scale_factor)),
-        "definition": ImageFont.truetype(LATIN_FONT, int(BASE_FONT_SIZES["definition"] * scale_factor)),
+        "character": _load_font(char_font, layout["character"]),
+        "korean": _load_font(KOREAN_FONT, layout["korean"]),
+        "pinyin": _load_font(LATIN_FONT, layout["pinyin"]),
+        "definition": _load_font(LATIN_FONT, layout["definition"]),
     }
 
 # --- Output Generation (In-Memory) ---
 
-def generate_png_bytes(char_data: dict, width: int, height: int, scale_factor: float, character_list: str = "hanja") -> BytesIO:
-    """Generate the wallpaper as PNG in memory."""
+def _draw_wallpaper(char_data: CharacterData, width: int, height: int, character_list: str = "hanja") -> Image.Image:
+    """Draw the wallpaper as an RGB image at the given resolution."""
     img = Image.new("RGB", (width, height), BACKGROUND_COLOR)
     draw = ImageDraw.Draw(img)
-    fonts = get_scaled_fonts(scale_factor, character_list)
+    fonts = get_scaled_fonts(width, character_list)
+    layout = get_scaled_layout(width)
 
-    center_y = height // 2 - int(100 * scale_factor)
+    center_y = height // 2 - layout["center_offset"]
 
     # Layout and draw text
-    character_bbox = draw.textbbox((0, 0), char_data["character"], font=fonts["character"])
+    character_bbox = _text_bbox(char_data["character"], fonts["character"])
     character_width = character_bbox[2] - character_bbox[0]
     character_height = character_bbox[3] - character_bbox[1]
     char_x = (width - character_width) // 2
     char_y = center_y - character_height // 2
     draw.text((char_x, char_y), char_data["character"], font=fonts["character"], fill=TEXT_COLOR)
 
-    y_cursor = char_y + character_height + int(140 * scale_factor)
+    y_cursor = char_y + character_height + layout["character_gap"]
 
-    pinyin_bbox = draw.textbbox((0, 0), char_data["pinyin"], font=fonts["pinyin"])
+    pinyin_bbox = _text_bbox(char_data["pinyin"], fonts["pinyin"])
     pinyin_width = pinyin_bbox[2] - pinyin_bbox[0]
     pinyin_height = pinyin_bbox[3] - pinyin_bbox[1]
     pinyin_x = (width - pinyin_width) // 2
     draw.text((pinyin_x, y_cursor), char_data["pinyin"], font=fonts["pinyin"], fill=SECONDARY_COLOR)
-    y_cursor += pinyin_height + int(90 * scale_factor)
+    y_cursor += pinyin_height + layout["pinyin_gap"]
 
     if char_data.get("korean"):
-        korean_bbox = draw.textbbox((0, 0), char_data["korean"], font=fonts["korean"])
+        korean_bbox = _text_bbox(char_data["korean"], fonts["korean"])
         korean_width = korean_bbox[2] - korean_bbox[0]
         korean_height = korean_bbox[3] - korean_bbox[1]
         korean_x = (width - korean_width) // 2
         draw.text((korean_x, y_cursor), char_data["korean"], font=fonts["korean"], fill=SECONDARY_COLOR)
-        y_cursor += korean_height + int(70 * scale_factor)
+        y_cursor += korean_height + layout["korean_gap"]
 
     max_text_width = int(width * 0.85)
-    definition_lines = wrap_text(char_data["definition"], fonts["definition"], max_text_width, draw)
-    line_height = int(BASE_FONT_SIZES["definition"] * scale_factor * 1.3)
+    definition_lines = wrap_text(char_data["definition"], fonts["definition"], max_text_width)
+    line_height = layout["line_height"]
 
     for line in definition_lines:
-        line_bbox = draw.textbbox((0, 0), line, font=fonts["definition"])
+        line_bbox = _text_bbox(line, fonts["definition"])
         line_width = line_bbox[2] - line_bbox[0]
         line_x = (width - line_width) // 2
         draw.text((line_x, y_cursor), line, font=fonts["definition"], fill=SECONDARY_COLOR)
         y_cursor += line_height
 
-    # Save to BytesIO instead of file
-    img_bytes = BytesIO()
-    img.save(img_bytes, format="PNG")
-    img_bytes.seek(0)
-    return img_bytes
+    return img
 
-def generate_svg_string(char_data: dict, width: int, height: int, scale_factor: float, character_list: str = "hanja") -> str:
-    """Generate the wallpaper as SVG string."""
-    dwg = svgwrite.Drawing(size=(width, height), profile="full", viewBox=f"0 0 {width} {height}")
+def generate_png_bytes(char_data: CharacterData, width: int, height: int, character_list: str = "hanja") -> bytes:
+    """Generate the wallpaper as PNG in memory."""
+    img = _draw_wallpaper(char_data, width, height, character_list)
 
-    # Add font-face declarations for web rendering
-    root_path = os.getenv("ROOT_PATH", "")
-    font_style = f"""
-        @font-face {{
-            font-family: 'HinaMincho-Regular';
-            src: url('{root_path}/fonts/HinaMincho-Regular.ttf') format('truetype');
-        }}
-        @font-face {{
-            font-family: 'YRDZST-Medium';
-            src: url('{root_path}/fonts/YRDZST-Medium.ttf') format('truetype');
-        }}
-        @font-face {{
-            font-family: 'Dongle-Regular';
-            src: url('{root_path}/fonts/Dongle-Regular.ttf') format('truetype');
-        }}
-        @font-face {{
-            font-family: 'WDXLLubrifontSC-Regular';
-            src: url('{root_path}/fonts/WDXLLubrifontSC-Regular.ttf') format('truetype');
-        }}
-    """
-    defs = dwg.defs
-    defs.add(dwg.style(font_style))
+    # Save to BytesIO instead of file
+    img_bytes = BytesIO()
+    img.save(img_bytes, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return img_bytes.getvalue()
 
-    dwg.add(dwg.rect(insert=(0, 0), size=(width, height), fill=BACKGROUND_COLOR))
+def generate_webp_bytes(char_data: CharacterData, width: int, height: int, character_list: str = "hanja") -> bytes:
+    """Generate the wallpaper as lossless WebP in memory."""
+    img = _draw_wallpaper(char_data, width, height, character_list)
 
+    # Lossless WebP is both smaller and faster to encode than lossy for
+    # flat-colored text on black
+    img_bytes = BytesIO()
+    img.save(img_bytes, format="WEBP", lossless=True, quality=100, method=4)
+    return img_bytes.getvalue()
+
+def _svg_text(text: str, x: float, y: int, font_size: int, attrs: str = "") -> str:
+    """Format a single SVG <text> element; attrs override the group defaults."""
+    return _SVG_TEXT_TEMPLATE.format(text=escape(text), x=x, y=y, font_size=font_size, attrs=attrs)
+
+@functools.lru_cache(maxsize=256)
+def _subset_font_data_uri(path: str, glyphs: str) -> str:
+    """Subset a font to the given characters and return it as a base64 WOFF2 data URI."""
+    # Imported here so only embed_fonts requests pay fontTools' import time
+    from fontTools import subset  # type: ignore[import-untyped]
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    font = subset.load_font(BytesIO(_font_bytes(path)), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=glyphs)
+    subsetter.subset(font)
+    woff2_bytes = BytesIO()
+    subset.save_font(font, woff2_bytes, options)
+    return "data:font/woff2;base64," + b64encode(woff2_bytes.getvalue()).decode("ascii")
+
+def _svg_font_faces(font_texts: dict[str, str], embed_fonts: bool) -> str:
+    """Build @font-face rules, either linking the /fonts/ mount or inlining per-text subsets."""
+    if not embed_fonts:
+        root_path = os.getenv("ROOT_PATH", "")
+        return "".join(
+            _SVG_FONT_FACE_TEMPLATE.format(family=family, src=f"{root_path}/fonts/{family}.ttf", format="truetype")
+            for family in SVG_FONTS
+        )
+
+    # Cache subsets by glyph set so repeated characters share one subset
+    return "".join(
+        _SVG_FONT_FACE_TEMPLATE.format(
+            family=family, src=_subset_font_data_uri(SVG_FONTS[family], "".join(sorted(set(text)))), format="woff2",
+        )
+        for family, text in font_texts.items() if text
+    )
+
+def generate_svg_string(char_data: CharacterData, width: int, height: int, character_list: str = "hanja", embed_fonts: bool = False) -> str:
+    """Generate the wallpaper as SVG string."""
     # Use appropriate font family for character
     char_font_family = "HinaMincho-Regular" if character_list == "hanja" else "YRDZST-Medium"
 
-    center_y = height // 2 - int(100 * scale_factor)
+    # Add font-face declarations for web rendering
+    font_texts = {
+        char_font_family: char_data["character"],
+        "Dongle-Regular": char_data.get("korean", ""),
+        "WDXLLubrifontSC-Regular": char_data["pinyin"] + char_data["definition"],
+    }
+    parts = [
+        _SVG_HEADER_TEMPLATE.format(
+            width=width, height=height, font_faces=_svg_font_faces(font_texts, embed_fonts),
+            background=BACKGROUND_COLOR, fill=SECONDARY_COLOR,
+        ),
+    ]
+
+    layout = get_scaled_layout(width)
+    center_y = height // 2 - layout["center_offset"]
 
     # Text height ratio: actual rendered height is smaller than font-size (em-box)
     # These ratios approximate the bbox height / font-size for each font
@@ -224,48 +372,101 @@ def generate_svg_string(char_data: dict, width: int, height: int, scale_factor:
     definition_height_ratio = 0.7
 
     # Add text elements - spacing matched to PNG generation
-    char_font_size = int(BASE_FONT_SIZES["character"] * scale_factor)
+    center_x = width / 2
+    char_font_size = layout["character"]
     char_y = center_y
-    dwg.add(dwg.text(char_data["character"], insert=(width / 2, char_y),
-                     font_family=char_font_family, font_size=char_font_size,
-                     fill=TEXT_COLOR, text_anchor="middle", dominant_baseline="middle"))
-    y_cursor = char_y + int(char_font_size * char_height_ratio / 2) + int(72 * scale_factor)
+    char_attrs = f' font-family="{char_font_family}" fill="{TEXT_COLOR}" dominant-baseline="middle"'
+    parts.append(_svg_text(char_data["character"], center_x, char_y, char_font_size, char_attrs))
+    y_cursor = char_y + int(char_font_size * char_height_ratio / 2) + layout["svg_character_gap"]
 
-    pinyin_font_size = int(BASE_FONT_SIZES["pinyin"] * scale_factor)
-    dwg.add(dwg.text(char_data["pinyin"], insert=(width / 2, y_cursor),
-                     font_family="WDXLLubrifontSC-Regular", font_size=pinyin_font_size,
-                     fill=SECONDARY_COLOR, text_anchor="middle", dominant_baseline="hanging"))
-    y_cursor += int(pinyin_font_size * pinyin_height_ratio) + int(90 * scale_factor)
+    pinyin_font_size = layout["pinyin"]
+    parts.append(_svg_text(char_data["pinyin"], center_x, y_cursor, pinyin_font_size))
+    y_cursor += int(pinyin_font_size * pinyin_height_ratio) + layout["pinyin_gap"]
 
     if char_data.get("korean"):
-        korean_font_size = int(BASE_FONT_SIZES["korean"] * scale_factor)
-        dwg.add(dwg.text(char_data["korean"], insert=(width / 2, y_cursor),
-                         font_family="Dongle-Regular", font_size=korean_font_size,
-                         fill=SECONDARY_COLOR, text_anchor="middle", dominant_baseline="hanging"))
-        y_cursor += int(korean_font_size * korean_height_ratio) + int(70 * scale_factor)
+        korean_font_size = layout["korean"]
+        parts.append(_svg_text(char_data["korean"], center_x, y_cursor, korean_font_size, ' font-family="Dongle-Regular"'))
+        y_cursor += int(korean_font_size * korean_height_ratio) + layout["korean_gap"]
 
-    definition_font_size = int(BASE_FONT_SIZES["definition"] * scale_factor)
+    definition_font_size = layout["definition"]
     max_text_width = int(width * 0.85)
     definition_lines = wrap_text_svg(char_data["definition"], definition_font_size, max_text_width)
     line_height = int(definition_font_size * 1.3)
 
     for line in definition_lines:
-        dwg.add(dwg.text(line, insert=(width / 2, y_cursor),
-                         font_family="WDXLLubrifontSC-Regular", font_size=definition_font_size,
-                         fill=SECONDARY_COLOR, text_anchor="middle", dominant_baseline="hanging"))
+        parts.append(_svg_text(line, center_x, y_cursor, definition_font_size))
         y_cursor += line_height
 
-    return dwg.tostring()
+    parts.append(_SVG_FOOTER)
+    return "".join(parts)
 
-def generate_xml_string(char_data: dict, width: int, height: int, model: str, character_list: str = "hanja") -> str:
+def generate_xml_string(char_data: CharacterData, width: int, height: int, model: str, character_list: str = "hanja") -> str:
     """Generate an XML string with character data."""
-    root = ET.Element("wallpaper")
-    ET.SubElement(root, "character", id=str(char_data["id"])).text = char_data["character"]
-    ET.SubElement(root, "pinyin").text = char_data["pinyin"]
-    if char_data.get("korean"):
-        ET.SubElement(root, "korean").text = char_data["korean"]
-    ET.SubElement(root, "definition").text = char_data["definition"]
-    ET.SubElement(root, "resolution", width=str(width), height=str(height), model=model)
+    korean = f"  <korean>{escape(char_data['korean'])}</korean>\n" if char_data.get("korean") else ""
+    return (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        "<wallpaper>\n"
+        f"  <character id=\"{char_data['id']}\">{escape(char_data['character'])}</character>\n"
+        f"  <pinyin>{escape(char_data['pinyin'])}</pinyin>\n"
+        f"{korean}"
+        f"  <definition>{escape(char_data['definition'])}</definition>\n"
+        f"  <resolution width=\"{width}\" height=\"{height}\" model=\"{escape(model, _XML_ATTR_ENTITIES)}\" />\n"
+        "</wallpaper>"
+    )
+
+# --- Wallpaper Generation ---
+
+# Media type of each output format
+OUTPUT_MEDIA_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "webp": "image/webp",
+    "xml": "application/xml",
+}
+
+@functools.lru_cache(maxsize=1024)
+def _generate_wallpaper_cached(character_list: str, character_id: int, width: int, height: int, output_type: str, embed_fonts: bool) -> bytes:
+    """Encode an image or SVG once per (character_list, character_id, resolution, output_type, embed_fonts)."""
+    char_data = get_character_data(character_list, character_id)
+
+    if output_type == "png":
+        return generate_png_bytes(char_data, width, height, character_list)
+    if output_type == "webp":
+        return generate_webp_bytes(char_data, width, height, character_list)
+    if output_type == "svg":
+        return generate_svg_string(char_data, width, height, character_list, embed_fonts).encode("utf-8")
+    raise ValueError(f"Unsupported output type: {output_type}")
+
+def generate_wallpaper(character_list: str, character_id: Optional[int], iphone_model: str, output_type: str = "png", embed_fonts: bool = False) -> bytes:
+    """
+    Generate a single wallpaper or data file and return its encoded contents.
+
+    With embed_fonts, SVG output inlines WOFF2 subsets of its fonts instead of linking /fonts/.
+    """
+    # Resolve random picks to an id first so they share the output cache
+    if character_id is None:
+        character_id = get_character_data(character_list)["id"]
+    width, height = IPHONE_RESOLUTIONS[iphone_model]
+
+    # Only XML names the model; it is a cheap string format and is not cached
+    if output_type == "xml":
+        char_data = get_character_data(character_list, character_id)
+        return generate_xml_string(char_data, width, height, iphone_model, character_list).encode("utf-8")
+
+    # Images and SVG depend only on the resolution, which several models share
+    return _generate_wallpaper_cached(character_list, character_id, width, height, output_type, embed_fonts)
+
+def generate_wallpapers_batch(items: Iterable[tuple[str, int, str, str]], max_workers: Optional[int] = None) -> list[bytes]:
+    """
+    Generate many wallpapers in parallel worker processes.
+
+    Each item is a (character_list, character_id, iphone_model, output_type) tuple;
+    results are returned in the same order as the items.
+    """
+    items = list(items)
+    if not items:
+        return []
 
-    ET.indent(root, space="  ")
-    return ET.tostring(root, encoding="unicode", xml_declaration=True)
+    # Workers load the character datasets once, when they import this module
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        return list(executor.map(generate_wallpaper, *zip(*items), chunksize=8))
@@ -1,10 +1,15 @@
+import functools
+import gzip
 import os
+from contextlib import asynccontextmanager
+import anyio.to_thread
+import brotli
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query, Header, Depends
-from fastapi.responses import JSONResponse, Response, StreamingResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Header, Depends, Request
+from fastapi.responses import JSONResponse, Response, FileResponse
 from fastapi.staticfiles import StaticFiles
 from typing import Literal, Optional
-from generate_wallpaper import generate_png_bytes, generate_svg_string, generate_xml_string, get_character_data, IPHONE_RESOLUTIONS, BASE_RESOLUTION
+from generate_wallpaper import generate_wallpaper, get_character_data, IPHONE_RESOLUTIONS, OUTPUT_MEDIA_TYPES
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,18 +18,79 @@ load_dotenv()
 API_KEY = os.getenv("API_KEY")
 ROOT_PATH = os.getenv("ROOT_PATH", "")
 
+# Worker threads for rendering and sync endpoints; Pillow releases the GIL while
+# rendering and encoding, so concurrent requests scale with cores (anyio default: 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE") or 0)
+
+# On-the-fly compression of text (SVG/XML) responses
+COMPRESSIBLE_OUTPUT_TYPES = {"svg", "xml"}
+COMPRESS_MINIMUM_SIZE = 500
+BROTLI_QUALITY = 5
+GZIP_COMPRESS_LEVEL = 6
+
 async def verify_api_key(x_api_key: Optional[str] = Header(None)):
     """Verify API key if one is configured."""
     if API_KEY and x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API key")
     return x_api_key
 
+def accepted_encodings(request: Request) -> set[str]:
+    """Parse the content codings the client accepts from Accept-Encoding, skipping any with q=0."""
+    accept_encoding = request.headers.get("accept-encoding", "")
+    encodings = set()
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding.lower())
+    return encodings
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Size the threadpool that runs rendering and sync endpoints."""
+    if THREADPOOL_SIZE:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    yield
+
+@functools.lru_cache(maxsize=1024)
+def compress_content(content: bytes, content_coding: str) -> bytes:
+    """
+    Compress an output once per content coding.
+
+    Keyed by the output bytes, which are memoized upstream, so models sharing a
+    resolution share one compressed copy.
+    """
+    if content_coding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+
+def encode_wallpaper(
+    character_list: str, character_id: int, iphone_model: str, output_type: str, embed_fonts: bool, encodings: set[str]
+) -> tuple[bytes, Optional[str]]:
+    """Generate a wallpaper and compress text outputs with the preferred coding the client accepts."""
+    content = generate_wallpaper(character_list, character_id, iphone_model, output_type, embed_fonts)
+
+    # Images are already compressed; only text outputs are encoded, preferring Brotli
+    if output_type in COMPRESSIBLE_OUTPUT_TYPES and len(content) >= COMPRESS_MINIMUM_SIZE:
+        for content_coding in ("br", "gzip"):
+            if content_coding in encodings:
+                return compress_content(content, content_coding), content_coding
+    return content, None
+
 app = FastAPI(
     title="Hanja API",
     description="Generate wallpapers or data files with Chinese/Hanja characters.",
     version="1.0.0",
     openapi_version="3.1.0",
-    root_path=ROOT_PATH
+    root_path=ROOT_PATH,
+    lifespan=lifespan
 )
 
 # Mount static directories
@@ -42,9 +108,10 @@ def root():
          response_description="Returns the generated file or a JSON error.",
          dependencies=[Depends(verify_api_key)],
 )
-def create_wallpaper_endpoint(
-    output_type: Literal["png", "svg", "xml"] = Query(
-        "png",
+async def create_wallpaper_endpoint(
+    request: Request,
+    output_type: Literal["svg", "png", "webp", "xml"] = Query(
+        "svg",
         description="The type of output to generate.",
     ),
     character_list: Literal["hsk", "hanja"] = Query(
@@ -60,14 +127,19 @@ def create_wallpaper_endpoint(
         "iphone_13_mini",
         description=f"The iPhone model for resolution. Available models: {', '.join(IPHONE_RESOLUTIONS.keys())}",
     ),
+    embed_fonts: bool = Query(
+        False,
+        description="Inline subsetted fonts in SVG output instead of linking /fonts/. Ignored for other output types.",
+    ),
 ):
     """
     Generates a wallpaper or data file based on the provided parameters.
 
-    - **output_type**: The format of the output file (`png`, `svg`, `xml`).
+    - **output_type**: The format of the output file (`svg`, `png`, `webp`, `xml`). SVG is the default. SVG and XML are Brotli- or gzip-compressed for clients that accept it.
     - **character_list**: The character set to draw from (`hsk` or `hanja`).
     - **character_id**: Specific character ID to use. If omitted, a random character is selected.
     - **iphone_model**: Defines the output resolution based on a preset iPhone model.
+    - **embed_fonts**: Embed WOFF2 subsets of the fonts in SVG output so it renders standalone.
     """
     if iphone_model not in IPHONE_RESOLUTIONS:
         raise HTTPException(
@@ -77,31 +149,23 @@ def create_wallpaper_endpoint(
 
     try:
         char_data = get_character_data(character_list, character_id)
-        width, height = IPHONE_RESOLUTIONS[iphone_model]
-        scale_factor = width / BASE_RESOLUTION[0]
-        
-        if output_type == "png":
-            img_bytes = generate_png_bytes(char_data, width, height, scale_factor, character_list)
-            return StreamingResponse(
-                img_bytes, 
-                media_type="image/png",
-                headers={"Content-Disposition": f"inline; filename=wallpaper_{character_list}_{char_data['id']}.png"}
-            )
-        elif output_type == "svg":
-            svg_string = generate_svg_string(char_data, width, height, scale_factor, character_list)
-            return Response(
-                content=svg_string,
-                media_type="image/svg+xml",
-                headers={"Content-Disposition": f"inline; filename=wallpaper_{character_list}_{char_data['id']}.svg"}
-            )
-        elif output_type == "xml":
-            xml_string = generate_xml_string(char_data, width, height, iphone_model, character_list)
-            return Response(
-                content=xml_string,
-                media_type="application/xml",
-                headers={"Content-Disposition": f"inline; filename=wallpaper_{character_list}_{char_data['id']}.xml"}
-            )
-            
+        # Render, encode and compress off the event loop
+        content, content_coding = await anyio.to_thread.run_sync(
+            encode_wallpaper, character_list, char_data["id"], iphone_model, output_type,
+            embed_fonts and output_type == "svg", accepted_encodings(request),
+        )
+        headers = {"Content-Disposition": f"inline; filename=wallpaper_{character_list}_{char_data['id']}.{output_type}"}
+        if output_type in COMPRESSIBLE_OUTPUT_TYPES:
+            headers["Vary"] = "Accept-Encoding"
+        if content_coding:
+            headers["Content-Encoding"] = content_coding
+
+        return Response(
+            content=content,
+            media_type=OUTPUT_MEDIA_TYPES[output_type],
+            headers=headers
+        )
+
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Subset the bundled fonts to the glyphs used by the character datasets.
+
+Run at build/release time, after any change to data/:
+
+    uv run subset_fonts.py
+
+Subsets are written to fonts/subset/ and are loaded by generate_wallpaper.py
+in place of the full fonts when present.
+"""
+
+import json
+from pathlib import Path
+
+from fontTools import subset
+
+SCRIPT_DIR = Path(__file__).parent
+DATA_DIR = SCRIPT_DIR / "data"
+FONT_DIR = SCRIPT_DIR / "fonts"
+SUBSET_FONT_DIR = FONT_DIR / "subset"
+
+# Fonts used for PNG/WebP rendering
+FONT_FILES = [
+    "YRDZST-Medium.ttf",
+    "HinaMincho-Regular.ttf",
+    "Dongle-Regular.ttf",
+    "WDXLLubrifontSC-Regular.ttf",
+]
+
+# Always keep printable ASCII so wrapped definitions never lose punctuation
+ASCII_CODEPOINTS = set(range(0x20, 0x7F))
+
+
+def collect_codepoints() -> set[int]:
+    """Collect every code point that appears in the character datasets."""
+    codepoints = set(ASCII_CODEPOINTS)
+    for path in sorted(DATA_DIR.glob("*_characters.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            characters = json.load(f)["characters"]
+        for char_data in characters:
+            for key in ("character", "pinyin", "korean", "definition"):
+                codepoints.update(ord(c) for c in char_data.get(key, ""))
+    return codepoints
+
+
+def subset_font(filename: str, codepoints: set[int]) -> Path:
+    """Write a subset of a bundled font containing only the given code points."""
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.hinting = True
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+
+    font = subset.load_font(str(FONT_DIR / filename), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+
+    output_path = SUBSET_FONT_DIR / filename
+    subset.save_font(font, str(output_path), options)
+    return output_path
+
+
+def main() -> None:
+    codepoints = collect_codepoints()
+    SUBSET_FONT_DIR.mkdir(exist_ok=True)
+    print(f"Subsetting fonts to {len(codepoints)} code points")
+    for filename in FONT_FILES:
+        output_path = subset_font(filename, codepoints)
+        original_size = (FONT_DIR / filename).stat().st_size
+        print(f"  {filename}: {original_size:,} -> {output_path.stat().st_size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()